@@ -0,0 +1,155 @@
+# Databricks notebook source
+# MAGIC %md
+# MAGIC # Marketing Campaign Analysis (Polars)
+# MAGIC
+# MAGIC Single-machine port of the cleaning, KPI and SQL analysis steps from `Marketing Campign Analysis.py`.
+# MAGIC
+# MAGIC The dataset (~200K rows) fits in memory on one machine, so the same results can be produced with Polars' lazy engine without a Spark cluster.
+# MAGIC
+# MAGIC Run from the repository root:
+# MAGIC
+# MAGIC ```bash
+# MAGIC pip install polars numpy
+# MAGIC python "notebooks/Marketing Campaign Analysis Polars.py"
+# MAGIC ```
+# MAGIC
+# MAGIC ---
+
+# COMMAND ----------
+
+#Data extraction
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+DATA_ZIP = Path("marketing_campaign_dataset.zip")
+DATA_PARQUET = Path("marketing_campaign_dataset.parquet")
+
+# Convert the zipped CSV to Parquet once; later runs scan the Parquet file directly
+if not DATA_PARQUET.exists():
+    with zipfile.ZipFile(DATA_ZIP) as zf:
+        pl.read_csv(zf.read("marketing_campaign_dataset.csv")).write_parquet(DATA_PARQUET)
+
+lf = pl.scan_parquet(DATA_PARQUET)
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC
+# MAGIC ## Data Cleaning & KPIs
+# MAGIC
+# MAGIC Same rules as the Databricks notebook: Acquisition_Cost as integer, CTR and Cost_per_Conversion KPIs, ROI categories.
+# MAGIC
+# MAGIC ---
+
+# COMMAND ----------
+
+# Acquisition_Cost: remove $ and , → cast to decimal → cast to int
+lf = lf.with_columns(
+    pl.col("Acquisition_Cost")
+    .str.strip_chars_start("$")
+    .str.replace_all(",", "", literal=True)
+    .cast(pl.Decimal(12, 2))
+    .cast(pl.Int32)
+)
+
+# KPIs added in a single projection
+lf = lf.with_columns(
+    # Cost per Conversion (unrounded; rounding is applied only when results are displayed)
+    (pl.col("Acquisition_Cost") / (pl.col("Conversion_Rate") * pl.col("Impressions"))).alias("Cost_per_Conversion"),
+    # CTR in percentage (unrounded)
+    (pl.col("Clicks") / pl.col("Impressions") * 100).alias("CTR"),
+    # ROI Category
+    pl.when(pl.col("ROI") >= 7).then(pl.lit("High"))
+    .when(pl.col("ROI") >= 5).then(pl.lit("Medium"))
+    .otherwise(pl.lit("Low"))
+    .alias("ROI_Category"),
+)
+
+# Materialize once; every analysis below reuses the in-memory frame
+df = lf.collect()
+print(df.head())
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC #### High-Cost, Low-ROI Campaigns (Top 50 Outliers)
+
+# COMMAND ----------
+
+cpc = df["Cost_per_Conversion"].to_numpy()
+roi = df["ROI"].to_numpy()
+
+# Branch-free mask over both columns, then a partial top-50 (O(N)) instead of sorting every match
+mask = (cpc > df["Cost_per_Conversion"].quantile(0.75)) & (roi < df["ROI"].quantile(0.25))
+candidates = np.flatnonzero(mask)
+k = min(50, candidates.size)
+top = candidates[np.argpartition(-cpc[candidates], k - 1)[:k]] if k else candidates
+top = top[np.argsort(-cpc[top])]
+
+outliers = df[top].select(
+    "Campaign_ID", "Company", "Campaign_Type", "Duration",
+    pl.col("Cost_per_Conversion").round(2), "ROI", pl.col("CTR").round(2),
+)
+print(outliers)
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC #### Languages × Channel performance (ROI & Conversion)
+
+# COMMAND ----------
+
+language_channel = (
+    df.lazy()
+    .group_by("Language", "Channel_Used")
+    .agg(
+        pl.col("ROI").mean().round(2).alias("avg_ROI"),
+        pl.col("Conversion_Rate").mean().round(4).alias("avg_conversion"),
+        pl.len().alias("campaigns"),
+    )
+    .filter(pl.col("campaigns") >= 50)
+    .sort("avg_ROI", descending=True)
+    .collect()
+)
+print(language_channel)
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC #### ROI Efficiency by Customer Segment (ROI per Dollar Spent)
+
+# COMMAND ----------
+
+segment_roi = (
+    df.lazy()
+    .filter(pl.col("Acquisition_Cost") > 0)
+    .group_by("Customer_Segment")
+    .agg(
+        (pl.col("ROI") / pl.col("Acquisition_Cost")).mean().round(6).alias("roi_per_dollar"),
+        pl.len().alias("campaigns"),
+    )
+    .sort("roi_per_dollar", descending=True)
+    .collect()
+)
+print(segment_roi)
+
+# COMMAND ----------
+
+# MAGIC %md
+# MAGIC #### High-Impression Campaigns Underperforming CTR (Below Channel Median)
+
+# COMMAND ----------
+
+low_ctr = (
+    df.lazy()
+    .with_columns(pl.col("CTR").median().over("Channel_Used").alias("median_ctr"))
+    .filter((pl.col("Impressions") >= 10000) & (pl.col("CTR") < pl.col("median_ctr")))
+    .select("Campaign_ID", "Company", "Channel_Used", "Impressions", "Clicks", pl.col("CTR").round(2), "Duration")
+    .sort("Impressions", descending=True)
+    .head(50)
+    .collect()
+)
+print(low_ctr)
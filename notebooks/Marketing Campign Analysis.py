@@ -17,13 +17,15 @@
 # MAGIC
 # MAGIC ## Data overview
 # MAGIC
-# MAGIC **Key columns:** Campaign_ID, Company, Campaign_Type, Channel_Used, Duration (kept as string categories), Conversion_Rate, Acquisition_Cost (int), ROI, Clicks, Impressions, CTR, Cost_per_Conversion, Engagement_Score, ROI_Category.
+# MAGIC **Key columns:** Campaign_ID, Company, Campaign_Type, Channel_Used, Duration (kept as string categories), Conversion_Rate, Acquisition_Cost (int), ROI, Clicks, Impressions, CTR, Cost_per_Conversion, Engagement_Score, ROI_Category_id (0 = High, 1 = Medium, 2 = Low).
 # MAGIC
 # MAGIC **Methods**
 # MAGIC
 # MAGIC - Loaded Unity Catalog table: workspace.default.marketing_campaign_dataset
 # MAGIC
 # MAGIC - Cleaned acquisition cost; standardized categorical columns.
+# MAGIC
+# MAGIC - Saved the cleaned data once as workspace.default.marketing_campaigns_clean (partitioned by Channel_Used, Z-ordered by cost, ROI and impressions).
 # MAGIC  
 # MAGIC - Performed SQL analysis using Spark SQL magic.
 # MAGIC  
@@ -35,16 +37,64 @@
 # COMMAND ----------
 
 #Data extraction
-from pyspark.sql.functions import regexp_replace, regexp_extract, col, round, when, sum as spark_sum
+from pyspark.sql.functions import translate, substring_index, regexp_extract, col, round, when, lit, broadcast, percentile_approx, count, sum as spark_sum
+from pyspark.sql.types import StructType, StructField, StringType, IntegerType, DoubleType, DateType
+
+# Transfer results to Python as Arrow column batches (falls back to row transfer for unsupported types)
+spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+spark.conf.set("spark.sql.execution.arrow.pyspark.fallback.enabled", "true")
+spark.conf.set("spark.sql.execution.arrow.maxRecordsPerBatch", "50000")
+
+# Re-run the null check only when validating a new extract of the data
+VALIDATE_NULLS = False
+# Show intermediate DataFrames; each display runs a Spark job
+DEBUG = False
+
+CLEAN_TABLE = "workspace.default.marketing_campaigns_clean"
+# Bump whenever the cleaning or KPI logic below changes, so a table built by older code is rebuilt
+# (2: ROI_Category string replaced by ROI_Category_id)
+CLEAN_TABLE_VERSION = "2"
+# Set to True to rebuild the cleaned table from the source regardless of its stored version
+FORCE_REBUILD = False
+
+# The source is loaded and cleaned only when the cleaned table is missing, stale, or a rebuild is forced
+REBUILD_CLEAN_TABLE = FORCE_REBUILD or not spark.catalog.tableExists(CLEAN_TABLE) or (
+    spark.sql(f"DESCRIBE DETAIL {CLEAN_TABLE}").first()["properties"].get("clean_table_version") != CLEAN_TABLE_VERSION
+)
 
-df = spark.table("workspace.default.marketing_campaign_dataset")
-display(df)
+# Source column types, declared once (Acquisition_Cost stays a string until it is cleaned below)
+SOURCE_SCHEMA = StructType([
+    StructField("Campaign_ID", IntegerType()),
+    StructField("Company", StringType()),
+    StructField("Campaign_Type", StringType()),
+    StructField("Target_Audience", StringType()),
+    StructField("Duration", StringType()),
+    StructField("Channel_Used", StringType()),
+    StructField("Conversion_Rate", DoubleType()),
+    StructField("Acquisition_Cost", StringType()),
+    StructField("ROI", DoubleType()),
+    StructField("Location", StringType()),
+    StructField("Language", StringType()),
+    StructField("Clicks", IntegerType()),
+    StructField("Impressions", IntegerType()),
+    StructField("Engagement_Score", IntegerType()),
+    StructField("Customer_Segment", StringType()),
+    StructField("Date", DateType()),
+])
+
+if REBUILD_CLEAN_TABLE:
+    df = spark.table("workspace.default.marketing_campaign_dataset")
+    # Cast to the declared types once at the source so downstream arithmetic never re-parses strings
+    df = df.select([col(f.name).cast(f.dataType) for f in SOURCE_SCHEMA.fields])
+    if DEBUG:
+        display(df)
 
 # COMMAND ----------
 
 # Check schema and row count
-df.printSchema()
-df.count()
+if REBUILD_CLEAN_TABLE:
+    df.printSchema()
+    print(df.count())
 
 # COMMAND ----------
 
@@ -64,38 +114,96 @@ df.count()
 
 # COMMAND ----------
 
-# Acquisition_Cost: remove $ and , → cast to double → cast to int
-df = df.withColumn(
-    "Acquisition_Cost",
-    regexp_replace(col("Acquisition_Cost"), "[$,]", "").cast("double").cast("int")
-)
+if REBUILD_CLEAN_TABLE:
+    # Acquisition_Cost: remove $ and , → drop the cents ("$16,174.00" → "16174") → cast to int
+    df = df.withColumn(
+        "Acquisition_Cost",
+        substring_index(translate(col("Acquisition_Cost"), "$,", ""), ".", 1).cast("int")
+    )
 
-# Check schema 
-df.printSchema()
+    # Check schema 
+    df.printSchema()
 
-# Count nulls in each column
-null_counts = df.select([spark_sum(col(c).isNull().cast("int")).alias(c) for c in df.columns])
+    # Count nulls in each column
+    if VALIDATE_NULLS:
+        null_counts = df.select([count(when(col(c).isNull(), c)).alias(c) for c in df.columns])
+        display(null_counts)
 
-display(null_counts)
+# COMMAND ----------
+
+# KPIs added in a single projection
+if REBUILD_CLEAN_TABLE:
+    df = df.select(
+        "*",
+        # Cost per Conversion (unrounded; rounding is applied only when results are displayed)
+        (col("Acquisition_Cost") / (col("Conversion_Rate") * col("Impressions"))).alias("Cost_per_Conversion"),
+        # CTR in percentage (unrounded)
+        ((col("Clicks") / col("Impressions"))*100).alias("CTR"),
+        # ROI Category as a 1-byte id; names live in the roi_categories lookup below
+        when(col("ROI") >= 7, lit(0))
+        .when(col("ROI") >= 5, lit(1))
+        .otherwise(lit(2))
+        .cast("tinyint")
+        .alias("ROI_Category_id")
+    )
+
+# ROI Category names, joined in only for display
+roi_categories = spark.createDataFrame(
+    [(0, "High"), (1, "Medium"), (2, "Low")],
+    "ROI_Category_id tinyint, ROI_Category string",
+)
 
 # COMMAND ----------
 
-# Cost per Conversion
-df = df.withColumn("Cost_per_Conversion", round(col("Acquisition_Cost") / (col("Conversion_Rate") * col("Impressions")),2))
+# Save the cleaned data once as a partitioned table and read it back from there
+if REBUILD_CLEAN_TABLE:
+    (df.write
+        .mode("overwrite")
+        .option("overwriteSchema", "true")
+        .option("parquet.block.size", 8 * 1024 * 1024)
+        .partitionBy("Channel_Used")
+        .saveAsTable(CLEAN_TABLE))
+    spark.sql(f"OPTIMIZE {CLEAN_TABLE} ZORDER BY (Cost_per_Conversion, ROI, Impressions)")
+    spark.sql(f"ALTER TABLE {CLEAN_TABLE} SET TBLPROPERTIES ('clean_table_version' = '{CLEAN_TABLE_VERSION}')")
+
+df = spark.table(CLEAN_TABLE)
+
+# Verify new columns on the stored table (KPIs rounded for display only)
+display(df.join(broadcast(roi_categories), "ROI_Category_id").withColumns({
+    "Cost_per_Conversion": round(col("Cost_per_Conversion"), 2),
+    "CTR": round(col("CTR"), 2),
+}))
+
+# COMMAND ----------
 
-# CTR in percentage
-df = df.withColumn("CTR", round((col("Clicks") / col("Impressions"))*100,2))
+# Cache only the columns the SQL analyses use, once, so every query below reads the in-memory copy
+from pyspark.storagelevel import StorageLevel
 
-# ROI Category
-df = df.withColumn(
-    "ROI_Category",
-    when(col("ROI") >= 7, "High")
-    .when(col("ROI") >= 5, "Medium")
-    .otherwise("Low")
+df_hot = df.select(
+    "Campaign_ID", "Company", "Campaign_Type", "Channel_Used", "Language", "Customer_Segment", "Duration",
+    "Conversion_Rate", "Acquisition_Cost", "ROI", "Clicks", "Impressions", "CTR", "Cost_per_Conversion",
+    "ROI_Category_id",
 )
+df_hot = df_hot.persist(StorageLevel.MEMORY_AND_DISK)
+df_hot.count()
+
+# ROI per dollar divides by Acquisition_Cost; the data has no zero-cost campaigns
+assert df_hot.filter(col("Acquisition_Cost") == 0).count() == 0
 
-# Verify new columns
-display(df)
+# Create a temporary SQL view for SQL queries
+df_hot.createOrReplaceTempView("marketing_campaigns")
+
+# COMMAND ----------
+
+# ROI category counts as conditional sums: one aggregation stage, no group-by shuffle
+def roi_category_counts(frame):
+    return frame.agg(
+        spark_sum((col("ROI_Category_id") == 0).cast("int")).alias("High"),
+        spark_sum((col("ROI_Category_id") == 1).cast("int")).alias("Medium"),
+        spark_sum((col("ROI_Category_id") == 2).cast("int")).alias("Low"),
+    )
+
+display(roi_category_counts(df_hot))
 
 # COMMAND ----------
 
@@ -104,7 +212,7 @@ display(df)
 # MAGIC
 # MAGIC #### ROI & Categories
 # MAGIC
-# MAGIC * **ROI category counts:** High = **1,709**, Medium = **3,357**, Low = **4,934**.
+# MAGIC * **ROI category counts:** High = **33,629**, Medium = **66,771**, Low = **99,600**.
 # MAGIC * **Observation:** Although Low ROI is the majority, the High ROI group is large enough to justify focused scaling experiments on those campaigns.
 # MAGIC
 # MAGIC #### Reach & Engagement
@@ -155,14 +263,10 @@ display(df)
 # MAGIC
 # MAGIC This section summarizes four advanced SQL analyses conducted on the `marketing_campaigns` dataset to identify outlier behavior, channel–language strengths, segment-level ROI efficiency, and underperforming high-reach campaigns. Each analysis is paired with recommended visualizations and key insights generated from the results.
 # MAGIC
+# MAGIC Each result is saved as a small table (`mc_outliers`, `mc_language_channel`, `mc_segment_roi`, `mc_low_ctr` in `workspace.default`) so dashboards and follow-up analyses can read it without re-running the query.
+# MAGIC
 # MAGIC ---
 
-# COMMAND ----------
-
-# Create a temporary SQL view for SQL queries
-df.createOrReplaceTempView("marketing_campaigns")
-
-
 # COMMAND ----------
 
 # MAGIC %md
@@ -170,15 +274,30 @@ df.createOrReplaceTempView("marketing_campaigns")
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC SELECT
-# MAGIC   Campaign_ID, Company, Campaign_Type, Duration, Cost_per_Conversion, ROI, CTR
-# MAGIC FROM marketing_campaigns
-# MAGIC WHERE Cost_per_Conversion > (SELECT percentile_approx(Cost_per_Conversion, 0.75) FROM marketing_campaigns)
-# MAGIC   AND ROI < (SELECT percentile_approx(ROI, 0.25) FROM marketing_campaigns)
-# MAGIC ORDER BY Cost_per_Conversion DESC
-# MAGIC LIMIT 50;
-# MAGIC
+# Outlier thresholds computed once (accuracy 1000 is ample for ~200K rows) and bound to the query as parameters
+thresholds = df_hot.agg(
+    percentile_approx("Cost_per_Conversion", 0.75, 1000).alias("cpc_p75"),
+    percentile_approx("ROI", 0.25, 1000).alias("roi_p25"),
+).first()
+
+# ORDER BY + LIMIT over the filtered rows plans as a top-50 (TakeOrderedAndProject), not a full sort
+(spark.sql("""
+WITH outliers AS (
+  SELECT Campaign_ID, Company, Campaign_Type, Duration, Cost_per_Conversion, ROI, CTR
+  FROM marketing_campaigns
+  WHERE Cost_per_Conversion > :cpc_p75
+    AND ROI < :roi_p25
+)
+SELECT
+  Campaign_ID, Company, Campaign_Type, Duration,
+  ROUND(Cost_per_Conversion, 2) AS Cost_per_Conversion, ROI, ROUND(CTR, 2) AS CTR
+FROM outliers
+ORDER BY Cost_per_Conversion DESC
+LIMIT 50
+""", args={"cpc_p75": thresholds["cpc_p75"], "roi_p25": thresholds["roi_p25"]})
+    .write.mode("overwrite").saveAsTable("workspace.default.mc_outliers"))
+
+display(spark.table("workspace.default.mc_outliers").orderBy(col("Cost_per_Conversion").desc()))
 
 # COMMAND ----------
 
@@ -197,17 +316,25 @@ df.createOrReplaceTempView("marketing_campaigns")
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC SELECT
-# MAGIC   Language, Channel_Used,
-# MAGIC   ROUND(AVG(ROI),2) AS avg_ROI,
-# MAGIC   ROUND(AVG(Conversion_Rate),4) AS avg_conversion,
-# MAGIC   COUNT(*) AS campaigns
-# MAGIC FROM marketing_campaigns
-# MAGIC GROUP BY Language, Channel_Used
-# MAGIC HAVING COUNT(*) >= 50
-# MAGIC ORDER BY avg_ROI DESC;
-# MAGIC
+# Language × Channel and Customer Segment KPIs in one aggregation pass; each table below filters its grouping
+group_kpis = spark.sql("""
+SELECT
+  Language, Channel_Used, Customer_Segment,
+  ROUND(AVG(ROI),2) AS avg_ROI,
+  ROUND(AVG(Conversion_Rate),4) AS avg_conversion,
+  ROUND(AVG(ROI / Acquisition_Cost), 6) AS roi_per_dollar,
+  COUNT(*) AS campaigns
+FROM marketing_campaigns
+WHERE Acquisition_Cost > 0
+GROUP BY GROUPING SETS ((Language, Channel_Used), (Customer_Segment))
+""").cache()
+
+(group_kpis
+    .filter(col("Language").isNotNull() & (col("campaigns") >= 50))
+    .select("Language", "Channel_Used", "avg_ROI", "avg_conversion", "campaigns")
+    .write.mode("overwrite").saveAsTable("workspace.default.mc_language_channel"))
+
+display(spark.table("workspace.default.mc_language_channel").orderBy(col("avg_ROI").desc()))
 
 # COMMAND ----------
 
@@ -227,15 +354,12 @@ df.createOrReplaceTempView("marketing_campaigns")
 
 # COMMAND ----------
 
-# MAGIC %sql
-# MAGIC SELECT
-# MAGIC   Customer_Segment,
-# MAGIC   ROUND(AVG(ROI / NULLIF(Acquisition_Cost,0)), 6) AS roi_per_dollar,
-# MAGIC   COUNT(*) AS campaigns
-# MAGIC FROM marketing_campaigns
-# MAGIC GROUP BY Customer_Segment
-# MAGIC ORDER BY roi_per_dollar DESC;
-# MAGIC
+(group_kpis
+    .filter(col("Customer_Segment").isNotNull())
+    .select("Customer_Segment", "roi_per_dollar", "campaigns")
+    .write.mode("overwrite").saveAsTable("workspace.default.mc_segment_roi"))
+
+display(spark.table("workspace.default.mc_segment_roi").orderBy(col("roi_per_dollar").desc()))
 
 # COMMAND ----------
 
@@ -255,19 +379,19 @@ df.createOrReplaceTempView("marketing_campaigns")
 # COMMAND ----------
 
 # MAGIC %sql
-# MAGIC WITH channel_medians AS (
-# MAGIC   SELECT Channel_Used, percentile_approx(CTR, 0.5) AS median_ctr
+# MAGIC CREATE OR REPLACE TABLE workspace.default.mc_low_ctr AS
+# MAGIC SELECT Campaign_ID, Company, Channel_Used, Impressions, Clicks, ROUND(CTR, 2) AS CTR, Duration
+# MAGIC FROM (
+# MAGIC   SELECT
+# MAGIC     Campaign_ID, Company, Channel_Used, Impressions, Clicks, CTR, Duration,
+# MAGIC     percentile_approx(CTR, 0.5, 1000) OVER (PARTITION BY Channel_Used) AS median_ctr
 # MAGIC   FROM marketing_campaigns
-# MAGIC   GROUP BY Channel_Used
 # MAGIC )
-# MAGIC SELECT m.Campaign_ID, m.Company, m.Channel_Used, m.Impressions, m.Clicks, m.CTR, m.Duration
-# MAGIC FROM marketing_campaigns m
-# MAGIC JOIN channel_medians cm ON m.Channel_Used = cm.Channel_Used
-# MAGIC WHERE m.Impressions >= 10000 AND m.CTR < cm.median_ctr
-# MAGIC ORDER BY m.Impressions DESC
+# MAGIC WHERE Impressions >= 10000 AND CTR < median_ctr
+# MAGIC ORDER BY Impressions DESC
 # MAGIC LIMIT 50;
 # MAGIC
-# MAGIC
+# MAGIC SELECT * FROM workspace.default.mc_low_ctr ORDER BY Impressions DESC;
 
 # COMMAND ----------
 
@@ -296,4 +420,10 @@ df.createOrReplaceTempView("marketing_campaigns")
 # MAGIC - Running targeted creative tests on underperforming high-impression campaigns  
 # MAGIC - Refining segment-specific messaging where ROI efficiency dips  
 # MAGIC
-# MAGIC ---
\ No newline at end of file
+# MAGIC ---
+
+# COMMAND ----------
+
+# Release the cached data
+group_kpis.unpersist()
+df_hot.unpersist()